@@ -1,19 +1,36 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
+import atexit
+import collections
+import functools
+import hashlib
+import hmac
 import json
+import logging
 import os
 import smtplib
 import sys
-from datetime import datetime
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from urllib.parse import quote, quote_plus
 
+import aiohttp
 import requests
-from alibabacloud_tea_openapi import models as open_api_models
-from alibabacloud_tea_openapi.client import Client as OpenApiClient
-from alibabacloud_tea_util import models as util_models
+from requests.adapters import HTTPAdapter
+from yarl import URL
+
+try:
+    import ujson  # 序列化更快，未安装时回退到标准库
+except ImportError:
+    ujson = None
+
+logger = logging.getLogger(__name__)
 
 # 区域名称映射
 REGION_NAMES = {
@@ -48,226 +65,310 @@ REGION_NAMES = {
     'me-central-1': '沙特(利雅得)',
 }
 
+# 通知共用的 HTTP 会话，复用 keep-alive 连接
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+# 企业微信专用会话（不校验证书），复用连接以省去重复的 TLS 握手
+_QYWX_SESSION = requests.Session()
+_QYWX_SESSION.mount('https://', HTTPAdapter(pool_maxsize=10))
+_QYWX_SESSION.verify = False
+
+# 企业微信 access_token 缓存：(corpid, corpsecret) -> (access_token, 过期时间戳)
+# 官方有效期 7200 秒，提前刷新以留出余量
+_TOKEN_CACHE = {}
+_TOKEN_TTL = 7000
+
+# access_token 失效/过期时接口返回的错误码
+_QYWX_TOKEN_ERRCODES = (40014, 42001)
+
+# 限制同时进行的阿里云 API 请求数，避免触发限流
+_API_CONCURRENCY = 10
+
 
+@functools.lru_cache(maxsize=1)
 def load_config():
-    """加载配置文件"""
+    """加载配置文件（进程内只读取一次）"""
     config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
     with open(config_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 
-def get_region_name(region_id):
-    """获取区域名称"""
-    return REGION_NAMES.get(region_id, '未知地区')
+# 阿里云 API 客户端：仅包含凭证和接入点，签名和请求由 api_call 完成
+AliyunClient = collections.namedtuple('AliyunClient', ['access_key_id', 'access_key_secret', 'endpoint'])
+
+# 空请求体的 SHA256 摘要（RPC 接口参数均放在查询串中）
+_EMPTY_PAYLOAD_SHA256 = hashlib.sha256(b'').hexdigest()
+
+# 阿里云 API 共用的 aiohttp 会话和并发信号量，在事件循环内按需创建
+# （两者都绑定创建时的事件循环，每次 asyncio.run 后需重新创建）
+_HTTP_SESSION = None
+_API_SEMAPHORE = None
+_API_SEMAPHORE_LOOP = None
+
+
+def get_account_name(account):
+    """获取账户显示名称，未配置 accountName 时使用脱敏后的 AccessKeyId"""
+    if 'accountName' in account:
+        return account['accountName']
+    return account.get('AccessKeyId', '')[:7] + '***'
 
 
 def create_cdt_client(access_key_id, access_key_secret):
     """创建 CDT API 客户端"""
-    config = open_api_models.Config(
-        access_key_id=access_key_id,
-        access_key_secret=access_key_secret,
-        endpoint='cdt.aliyuncs.com'
-    )
-    return OpenApiClient(config)
+    return AliyunClient(access_key_id, access_key_secret, 'cdt.aliyuncs.com')
 
 
 def create_ecs_client(access_key_id, access_key_secret, region_id):
     """创建 ECS API 客户端"""
-    config = open_api_models.Config(
-        access_key_id=access_key_id,
-        access_key_secret=access_key_secret,
-        endpoint=f'ecs.{region_id}.aliyuncs.com'
-    )
-    return OpenApiClient(config)
-
-
-def api_call(client, action, version, queries=None):
-    """通用 API 调用"""
-    params = open_api_models.Params(
-        action=action,
-        version=version,
-        protocol='HTTPS',
-        method='POST',
-        auth_type='AK',
-        style='RPC',
-        pathname='/',
-        req_body_type='json',
-        body_type='json',
+    return AliyunClient(access_key_id, access_key_secret, f'ecs.{region_id}.aliyuncs.com')
+
+
+def get_http_session():
+    """获取共用的 aiohttp 会话"""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed:
+        _HTTP_SESSION = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+    return _HTTP_SESSION
+
+
+def get_api_semaphore():
+    """获取当前事件循环的 API 并发信号量"""
+    global _API_SEMAPHORE, _API_SEMAPHORE_LOOP
+    loop = asyncio.get_running_loop()
+    if _API_SEMAPHORE is None or _API_SEMAPHORE_LOOP is not loop:
+        _API_SEMAPHORE = asyncio.Semaphore(_API_CONCURRENCY)
+        _API_SEMAPHORE_LOOP = loop
+    return _API_SEMAPHORE
+
+
+async def close_http_session():
+    """关闭共用的 aiohttp 会话，并释放绑定当前事件循环的信号量"""
+    global _HTTP_SESSION, _API_SEMAPHORE, _API_SEMAPHORE_LOOP
+    if _HTTP_SESSION is not None:
+        await _HTTP_SESSION.close()
+        _HTTP_SESSION = None
+    _API_SEMAPHORE = None
+    _API_SEMAPHORE_LOOP = None
+
+
+def percent_encode(value):
+    """按 RFC 3986 编码（阿里云签名要求）"""
+    return quote(str(value), safe='-_.~')
+
+
+def aliyun_sign_v3(client, action, version, queries, date=None, nonce=None):
+    """按阿里云 ACS3-HMAC-SHA256 (V3) 规范签名，返回请求头和规范化查询串
+
+    date 和 nonce 默认取当前 UTC 时间和随机值，仅在校验签名结果时需要固定传入。
+    """
+    headers = {
+        'host': client.endpoint,
+        'x-acs-action': action,
+        'x-acs-content-sha256': _EMPTY_PAYLOAD_SHA256,
+        'x-acs-date': date or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'x-acs-signature-nonce': nonce or uuid.uuid4().hex,
+        'x-acs-version': version,
+    }
+    canonical_query = '&'.join(
+        f'{percent_encode(key)}={percent_encode(value)}' for key, value in sorted(queries.items()))
+    signed_headers = ';'.join(sorted(headers))
+    canonical_headers = ''.join(f'{key}:{headers[key]}\n' for key in sorted(headers))
+    canonical_request = '\n'.join([
+        'POST', '/', canonical_query, canonical_headers, signed_headers, _EMPTY_PAYLOAD_SHA256,
+    ])
+    string_to_sign = f"ACS3-HMAC-SHA256\n{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
+    signature = hmac.new(
+        client.access_key_secret.encode('utf-8'), string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+    headers['Authorization'] = (
+        f'ACS3-HMAC-SHA256 Credential={client.access_key_id},'
+        f'SignedHeaders={signed_headers},Signature={signature}'
     )
-    request = open_api_models.OpenApiRequest(query=queries or {})
-    runtime = util_models.RuntimeOptions()
-    result = client.call_api(params, request, runtime)
-    return result.get('body', {})
+    return headers, canonical_query
+
 
+async def api_call(client, action, version, queries=None):
+    """通用 API 调用（直接签名并通过 aiohttp 发送 RPC 请求）"""
+    headers, canonical_query = aliyun_sign_v3(client, action, version, queries or {})
+    # 查询串已按签名规则编码，禁止 aiohttp 再次编码
+    url = URL(f'https://{client.endpoint}/?{canonical_query}', encoded=True)
+    async with get_api_semaphore():
+        # 请求体为空，禁止 aiohttp 自动添加未参与签名的 Content-Type
+        async with get_http_session().post(url, headers=headers, skip_auto_headers=('Content-Type',)) as resp:
+            result = await resp.json(content_type=None)
+    if resp.status != 200:
+        raise Exception(f"{result.get('Code')}: {result.get('Message')} (RequestId: {result.get('RequestId')})")
+    return result
 
-def get_traffic(access_key_id, access_key_secret):
+
+async def get_traffic(access_key_id, access_key_secret, account_name=''):
     """获取 CDT 流量使用量（GB）"""
     try:
         client = create_cdt_client(access_key_id, access_key_secret)
-        result = api_call(client, 'ListCdtInternetTraffic', '2021-08-13')
+        result = await api_call(client, 'ListCdtInternetTraffic', '2021-08-13')
         traffic_details = result.get('TrafficDetails', [])
         total = sum(item.get('Traffic', 0) for item in traffic_details)
         return total / (1024 * 1024 * 1024)  # 转换为 GB
-    except Exception as e:
-        print(f'获取流量异常: {e}')
+    except Exception:
+        logger.exception('获取流量异常: %s', account_name)
         return 0
 
 
-def get_security_group_id(instance_id, access_key_id, access_key_secret, region_id):
-    """获取实例的安全组 ID"""
-    try:
-        client = create_ecs_client(access_key_id, access_key_secret, region_id)
-        result = api_call(client, 'DescribeInstanceAttribute', '2014-05-26', {
-            'RegionId': region_id,
-            'InstanceId': instance_id,
-        })
-        return result['SecurityGroupIds']['SecurityGroupId'][0]
-    except Exception as e:
-        print(f'获取安全组ID异常: {e}')
-        return None
+# 0.0.0.0/0 全协议入站放行规则：(IpProtocol, SourceCidrIp, Policy, NicType, Direction)
+_OPEN_INGRESS_RULE = ('ALL', '0.0.0.0/0', 'Accept', 'intranet', 'ingress')
 
 
-def is_security_group_rule_enabled(security_group_id, access_key_id, access_key_secret, region_id):
+async def is_security_group_rule_enabled(security_group_id, access_key_id, access_key_secret, region_id,
+                                         account_name=''):
     """检查安全组中是否存在 0.0.0.0/0 入站规则"""
     try:
         client = create_ecs_client(access_key_id, access_key_secret, region_id)
-        result = api_call(client, 'DescribeSecurityGroupAttribute', '2014-05-26', {
+        result = await api_call(client, 'DescribeSecurityGroupAttribute', '2014-05-26', {
             'RegionId': region_id,
             'SecurityGroupId': security_group_id,
         })
         permissions = result.get('Permissions', {}).get('Permission', [])
-        for rule in permissions:
-            if (rule.get('IpProtocol', '').upper() == 'ALL'
-                    and rule.get('SourceCidrIp') == '0.0.0.0/0'
-                    and rule.get('Policy') == 'Accept'
-                    and rule.get('NicType') == 'intranet'
-                    and rule.get('Direction') == 'ingress'):
-                return True
-        return False
-    except Exception as e:
-        print(f'检查安全组规则异常: {e}')
+        return any(
+            (rule.get('IpProtocol', '').upper(), rule.get('SourceCidrIp'), rule.get('Policy'),
+             rule.get('NicType'), rule.get('Direction')) == _OPEN_INGRESS_RULE
+            for rule in permissions
+        )
+    except Exception:
+        logger.exception('检查安全组规则异常: %s', account_name)
         return False
 
 
-def disable_security_group_rule(security_group_id, access_key_id, access_key_secret, region_id):
+async def disable_security_group_rule(security_group_id, access_key_id, access_key_secret, region_id,
+                                      account_name=''):
     """禁用安全组中 0.0.0.0/0 的入站规则"""
     try:
         client = create_ecs_client(access_key_id, access_key_secret, region_id)
-        api_call(client, 'RevokeSecurityGroup', '2014-05-26', {
+        await api_call(client, 'RevokeSecurityGroup', '2014-05-26', {
             'RegionId': region_id,
             'SecurityGroupId': security_group_id,
             'IpProtocol': 'all',
             'PortRange': '-1/-1',
             'SourceCidrIp': '0.0.0.0/0',
         })
-        print('已禁用0.0.0.0/0的全部协议规则')
-    except Exception as e:
-        print(f'禁用安全组规则异常: {e}')
+        logger.info('已禁用0.0.0.0/0的全部协议规则: %s', account_name)
+    except Exception:
+        logger.exception('禁用安全组规则异常: %s', account_name)
 
 
-def enable_security_group_rule(security_group_id, access_key_id, access_key_secret, region_id):
+async def enable_security_group_rule(security_group_id, access_key_id, access_key_secret, region_id,
+                                     account_name=''):
     """恢复安全组中 0.0.0.0/0 的入站规则"""
     try:
         client = create_ecs_client(access_key_id, access_key_secret, region_id)
-        api_call(client, 'AuthorizeSecurityGroup', '2014-05-26', {
+        await api_call(client, 'AuthorizeSecurityGroup', '2014-05-26', {
             'RegionId': region_id,
             'SecurityGroupId': security_group_id,
             'IpProtocol': 'all',
             'PortRange': '-1/-1',
             'SourceCidrIp': '0.0.0.0/0',
         })
-        print('已恢复0.0.0.0/0的全部协议规则')
-    except Exception as e:
-        print(f'恢复安全组规则异常: {e}')
+        logger.info('已恢复0.0.0.0/0的全部协议规则: %s', account_name)
+    except Exception:
+        logger.exception('恢复安全组规则异常: %s', account_name)
 
 
-def validate_credentials_and_instance(account, notification_config):
-    """验证 AK/SK 和实例 ID 是否有效"""
+async def fetch_instance_snapshot(account, notification_config):
+    """通过一次 DescribeInstances 验证 AK/SK 和实例 ID，并获取安全组 ID、到期时间、公网 IP"""
     try:
+        instance_id = account['instanceId']
         client = create_ecs_client(account['AccessKeyId'], account['AccessKeySecret'], account['regionId'])
-        result = api_call(client, 'DescribeInstances', '2014-05-26', {
+        result = await api_call(client, 'DescribeInstances', '2014-05-26', {
             'RegionId': account['regionId'],
+            # 实例 ID 仅含字母、数字和连字符，无需 JSON 转义
+            'InstanceIds': f'["{instance_id}"]',
         })
         instances = result.get('Instances', {}).get('Instance', [])
-        instance_valid = any(inst['InstanceId'] == account['instanceId'] for inst in instances)
-        if not instance_valid:
-            raise Exception(f"指定的实例ID不存在: {account['instanceId']}")
-        return True
+        if not instances:
+            raise Exception(f"指定的实例ID不存在: {instance_id}")
+        instance = instances[0]
+        security_group_ids = instance.get('SecurityGroupIds', {}).get('SecurityGroupId', [])
+        return {
+            'instance_valid': True,
+            'security_group_id': security_group_ids[0] if security_group_ids else None,
+            'expiration_time': instance.get('ExpiredTime', '无到期时间'),
+            'public_ip': instance.get('EipAddress', {}).get('IpAddress') or '无公网 IP 地址',
+        }
     except Exception as e:
-        print(f"验证异常: {e}")
+        logger.exception('验证异常: %s', get_account_name(account))
         log = {
             '服务器': account.get('accountName', ''),
             '实例ID': account.get('instanceId', ''),
             '错误信息': str(e),
         }
-        send_notification(log, notification_config)
-        return False
+        await send_notification(log, notification_config)
+        return {'instance_valid': False}
 
 
-def get_instance_details(access_key_id, access_key_secret, instance_id, region_id):
-    """获取实例详细信息（到期时间、公网 IP）"""
-    try:
-        client = create_ecs_client(access_key_id, access_key_secret, region_id)
-        result = api_call(client, 'DescribeInstances', '2014-05-26', {
-            'RegionId': region_id,
-            'InstanceIds': json.dumps([instance_id]),
-        })
-        instances = result.get('Instances', {}).get('Instance', [])
-        if instances:
-            instance = instances[0]
-            expiration_time = instance.get('ExpiredTime', '无到期时间')
-            public_ip = '无公网 IP 地址'
-            eip = instance.get('EipAddress', {}).get('IpAddress')
-            if eip:
-                public_ip = eip
-            return {'到期时间': expiration_time, '公网IP地址': public_ip}
-        return {'到期时间': '无到期时间', '公网IP地址': '无公网 IP 地址'}
-    except Exception as e:
-        print(f'获取实例详情异常: {e}')
-        return {'到期时间': '查询失败', '公网IP地址': '查询失败'}
-
-
-def send_notification(log, notification_config):
-    """发送通知"""
-    # 组装通知内容
+async def send_notification(log, notification_config):
+    """根据日志组装通知内容并发送"""
     if '错误信息' in log:
-        message = f"⚠️ 错误通知\n"
-        message += f"服务器: {log.get('服务器', '')}\n"
-        message += f"错误信息: {log['错误信息']}\n"
-        if '实例ID' in log:
-            message += f"实例ID: {log['实例ID']}\n"
+        instance_line = f"实例ID: {log['实例ID']}\n" if '实例ID' in log else ''
+        message = (
+            f"⚠️ 错误通知\n"
+            f"服务器: {log.get('服务器', '')}\n"
+            f"错误信息: {log['错误信息']}\n"
+            f"{instance_line}"
+        )
     else:
-        message = f"服务器: {log['服务器']}\n"
-        message += f"实例ID: {log['实例ID']}\n"
-        message += f"实例IP: {log['公网IP地址']}\n"
-        message += f"到期时间: {log['实例到期时间']}\n"
-        message += f"CDT总流量: {log['总流量']}\n"
-        message += f"已使用流量: {log['已使用流量']}\n"
-        message += f"使用百分比: {log['使用百分比']}\n"
-        message += f"地区: {log['地区']}\n"
-        message += f"安全组状态: {log['安全组状态']}\n"
-
-    results = {}
+        message = (
+            f"服务器: {log['服务器']}\n"
+            f"实例ID: {log['实例ID']}\n"
+            f"实例IP: {log['公网IP地址']}\n"
+            f"到期时间: {log['实例到期时间']}\n"
+            f"CDT总流量: {log['总流量']}\n"
+            f"已使用流量: {log['已使用流量']}\n"
+            f"使用百分比: {log['使用百分比']}\n"
+            f"地区: {log['地区']}\n"
+            f"安全组状态: {log['安全组状态']}\n"
+        )
+    return await send_notification_message(message, notification_config)
+
+
+async def send_notification_message(message, notification_config, title_override=None):
+    """发送通知（各渠道并发发送），title_override 用于替换 Webhook 和企业微信的标题"""
     title = notification_config.get('title', 'CDT流量统计')
+    rich_title = title_override or title
+    channels = []  # (渠道名, 发送函数, 参数)
+    results = {}
+
+    def add_channel(name, func, build_args):
+        # 参数在此处取自配置，缺少配置项时仅该渠道记为失败，其余渠道照常发送
+        try:
+            channels.append((name, func, build_args()))
+        except KeyError as e:
+            logger.error('%s 通知缺少配置项: %s', name, e)
+            results[name] = f'缺少配置项: {e}'
 
     if notification_config.get('enableEmail'):
-        results['email'] = send_email_notification(message, title, notification_config)
+        add_channel('email', send_email_notification, lambda: (
+            message, title, notification_config))
 
     if notification_config.get('enableBark'):
-        results['bark'] = send_bark_notification(message, notification_config['barkUrl'])
+        add_channel('bark', send_bark_notification, lambda: (
+            message, notification_config['barkUrl']))
 
     if notification_config.get('enableTG'):
-        results['tg'] = send_tg_notification(message, notification_config['tgBotToken'], notification_config['tgChatId'])
+        add_channel('tg', send_tg_notification, lambda: (
+            message, notification_config['tgBotToken'], notification_config['tgChatId']))
 
     if notification_config.get('enableWebhook'):
-        results['webhook'] = send_webhook_notification(
-            message, notification_config['webhookUrl'], title, notification_config['webhookId'])
+        add_channel('webhook', send_webhook_notification, lambda: (
+            message, notification_config['webhookUrl'], rich_title, notification_config['webhookId']))
 
     if notification_config.get('enableQywx'):
-        results['qywx'] = send_qywx_notification(
-            message, title, notification_config['touser'], notification_config['corpid'],
+        add_channel('qywx', send_qywx_notification, lambda: (
+            message, rich_title, notification_config['touser'], notification_config['corpid'],
             notification_config['corpsecret'], notification_config['agentid'],
-            notification_config['baseApiUrl'], notification_config['picUrl'])
+            notification_config['baseApiUrl'], notification_config['picUrl']))
+
+    # 各通知渠道互不依赖，并发发送；协程只在此处创建
+    sent = await asyncio.gather(*[asyncio.to_thread(func, *args) for _, func, args in channels])
+    results.update(zip([name for name, _, _ in channels], sent))
 
     for key, result in results.items():
         if result is not True:
@@ -275,6 +376,58 @@ def send_notification(log, notification_config):
     return True
 
 
+class EmailSender:
+    """复用同一个 SMTP 连接发送邮件，进程退出时关闭连接"""
+
+    def __init__(self):
+        self._server = None
+        self._server_key = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _connect(config):
+        if config.get('secure') == 'tls':
+            server = smtplib.SMTP(config['host'], config['port'])
+            server.starttls()
+        else:
+            server = smtplib.SMTP_SSL(config['host'], config['port'])
+        server.login(config['username'], config['password'])
+        return server
+
+    def _quit(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._server = None
+        self._server_key = None
+
+    def send(self, config, msg):
+        """发送邮件，首次发送时建立连接并登录"""
+        server_key = (config['host'], config['port'], config['username'])
+        with self._lock:
+            if self._server_key != server_key:
+                self._quit()
+                self._server = self._connect(config)
+                self._server_key = server_key
+            try:
+                self._server.sendmail(config['username'], config['email'], msg.as_string())
+            except smtplib.SMTPServerDisconnected:
+                # 连接被服务器关闭，重连后重试一次
+                self._server = self._connect(config)
+                self._server.sendmail(config['username'], config['email'], msg.as_string())
+
+    def close(self):
+        """关闭 SMTP 连接"""
+        with self._lock:
+            self._quit()
+
+
+EMAIL_SENDER = EmailSender()
+atexit.register(EMAIL_SENDER.close)
+
+
 def send_email_notification(message, title, config):
     """发送邮件通知"""
     try:
@@ -284,29 +437,20 @@ def send_email_notification(message, title, config):
         msg['Subject'] = title
         html_body = message.replace('\n', '<br>')
         msg.attach(MIMEText(html_body, 'html', 'utf-8'))
-
-        if config.get('secure') == 'tls':
-            server = smtplib.SMTP(config['host'], config['port'])
-            server.starttls()
-        else:
-            server = smtplib.SMTP_SSL(config['host'], config['port'])
-        server.login(config['username'], config['password'])
-        server.sendmail(config['username'], config['email'], msg.as_string())
-        server.quit()
+        EMAIL_SENDER.send(config, msg)
         return True
     except Exception as e:
-        print(f'邮件发送失败: {e}')
+        logger.exception('邮件发送失败')
         return str(e)
 
 
 def send_bark_notification(message, bark_url):
     """发送 Bark 通知"""
     try:
-        full_url = f"{bark_url}/流量告警/{quote(message)}"
-        resp = requests.get(full_url, timeout=10)
+        resp = _SESSION.post(bark_url, json={'title': '流量告警', 'body': message}, timeout=10)
         return resp.status_code == 200
-    except Exception as e:
-        print(f'Bark 通知失败: {e}')
+    except Exception:
+        logger.exception('Bark 通知失败')
         return False
 
 
@@ -314,10 +458,10 @@ def send_tg_notification(message, bot_token, chat_id):
     """发送 Telegram 通知"""
     try:
         url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        resp = requests.get(url, params={'chat_id': chat_id, 'text': message}, timeout=10)
+        resp = _SESSION.get(url, params={'chat_id': chat_id, 'text': message}, timeout=10)
         return resp.status_code == 200
-    except Exception as e:
-        print(f'Telegram 通知失败: {e}')
+    except Exception:
+        logger.exception('Telegram 通知失败')
         return False
 
 
@@ -325,24 +469,31 @@ def send_webhook_notification(message, webhook_url, title, webhook_id):
     """发送 Webhook 通知"""
     try:
         full_url = f"{webhook_url}&id={webhook_id}&title={quote(title)}&content={quote_plus(message)}"
-        resp = requests.get(full_url, timeout=10)
+        resp = _SESSION.get(full_url, timeout=10)
         return resp.status_code == 200
-    except Exception as e:
-        print(f'Webhook 通知失败: {e}')
+    except Exception:
+        logger.exception('Webhook 通知失败')
         return False
 
 
+def get_qywx_access_token(base_api_url, corpid, corpsecret):
+    """获取企业微信 access_token，有效期内复用缓存"""
+    cache_key = (corpid, corpsecret)
+    access_token, expires_at = _TOKEN_CACHE.get(cache_key, (None, 0))
+    if time.time() < expires_at:
+        return access_token
+
+    token_url = f"{base_api_url}/cgi-bin/gettoken?corpid={corpid}&corpsecret={corpsecret}"
+    resp = _QYWX_SESSION.get(token_url, timeout=10)
+    token_data = resp.json()
+    access_token = token_data['access_token']
+    _TOKEN_CACHE[cache_key] = (access_token, time.time() + _TOKEN_TTL)
+    return access_token
+
+
 def send_qywx_notification(message, title, touser, corpid, corpsecret, agentid, base_api_url, pic_url):
     """发送企业微信通知"""
     try:
-        # 获取 access_token
-        token_url = f"{base_api_url}/cgi-bin/gettoken?corpid={corpid}&corpsecret={corpsecret}"
-        resp = requests.get(token_url, timeout=10, verify=False)
-        token_data = resp.json()
-        access_token = token_data['access_token']
-
-        # 发送消息
-        send_url = f"{base_api_url}/cgi-bin/message/send?access_token={access_token}"
         postdata = {
             'touser': touser,
             'msgtype': 'news',
@@ -359,87 +510,131 @@ def send_qywx_notification(message, title, touser, corpid, corpsecret, agentid,
             'enable_duplicate_check': 0,
             'duplicate_check_interval': 1800,
         }
-        resp = requests.post(send_url, json=postdata, timeout=10, verify=False)
-        response = resp.json()
+
+        # 缓存的 access_token 可能已提前失效，此时重新获取并重发一次
+        for _ in range(2):
+            access_token = get_qywx_access_token(base_api_url, corpid, corpsecret)
+            send_url = f"{base_api_url}/cgi-bin/message/send?access_token={access_token}"
+            resp = _QYWX_SESSION.post(send_url, json=postdata, timeout=10)
+            response = resp.json()
+            if response.get('errcode') not in _QYWX_TOKEN_ERRCODES:
+                break
+            # 仅丢弃本次使用的 token，避免覆盖其他线程刚刷新的 token
+            if _TOKEN_CACHE.get((corpid, corpsecret), (None, 0))[0] == access_token:
+                _TOKEN_CACHE.pop((corpid, corpsecret), None)
+
         if response.get('errcode') != 0:
-            print(f'企业微信通知接口返回错误: {response}')
+            logger.error('企业微信通知接口返回错误: %s', response)
         return response.get('errcode') == 0
-    except Exception as e:
-        print(f'企业微信通知失败: {e}')
+    except Exception:
+        logger.exception('企业微信通知失败')
         return False
 
 
-def check():
-    """主检测逻辑"""
+async def collect_account_status(account, notification_config):
+    """查询账户状态：先验证实例，通过后并发查询流量和安全组规则；验证失败时返回 None"""
+    snapshot = await fetch_instance_snapshot(account, notification_config)
+    # AK/SK 或实例 ID 无效时不再发起后续查询
+    if not snapshot['instance_valid']:
+        return None
+
+    account_name = get_account_name(account)
+    traffic, is_enabled = await asyncio.gather(
+        get_traffic(account['AccessKeyId'], account['AccessKeySecret'], account_name),
+        is_security_group_rule_enabled(
+            snapshot['security_group_id'], account['AccessKeyId'], account['AccessKeySecret'], account['regionId'],
+            account_name),
+    )
+    return {
+        **snapshot,
+        'traffic': traffic,
+        'usage_percentage': round((traffic / account['maxTraffic']) * 100, 2),
+        'is_enabled': is_enabled,
+    }
+
+
+async def process_account(account, notification_config):
+    """检测单个账户，返回日志；验证失败或出现异常时返回 None"""
+    try:
+        account_name = get_account_name(account)
+        status = await collect_account_status(account, notification_config)
+        if status is None:
+            return None
+        traffic = status['traffic']
+        usage_percentage = status['usage_percentage']
+        security_group_id = status['security_group_id']
+        region_name = REGION_NAMES.get(account['regionId'], '未知地区')
+
+        log = {
+            '实例ID': account['instanceId'],
+            '服务器': account_name,
+            '总流量': f"{account['maxTraffic']}GB",
+            '已使用流量': f"{round(traffic, 2)}GB",
+            '使用百分比': f"{usage_percentage}%",
+            '地区': region_name,
+            '实例到期时间': status['expiration_time'],
+            '公网IP地址': status['public_ip'],
+            '使用率达到95%': '是' if usage_percentage >= 95 else '否',
+        }
+
+        if usage_percentage >= 95:
+            if status['is_enabled']:
+                await disable_security_group_rule(
+                    security_group_id, account['AccessKeyId'], account['AccessKeySecret'], account['regionId'],
+                    account_name)
+                log['安全组状态'] = '已禁用 0.0.0.0/0 访问规则'
+                notification_result = await send_notification(log, notification_config)
+                log['通知发送'] = '成功' if notification_result is True else f"失败: {notification_result}"
+            else:
+                log['安全组状态'] = '规则已禁用，无需操作'
+                log['通知发送'] = '不需要'
+        else:
+            if not status['is_enabled']:
+                await enable_security_group_rule(
+                    security_group_id, account['AccessKeyId'], account['AccessKeySecret'], account['regionId'],
+                    account_name)
+                log['安全组状态'] = '已恢复 0.0.0.0 访问规则'
+                notification_result = await send_notification(log, notification_config)
+                log['通知发送'] = '成功' if notification_result is True else f"失败: {notification_result}"
+            else:
+                log['安全组状态'] = '规则已启用，无需操作'
+                log['通知发送'] = '不需要'
+
+        return log
+    except Exception as e:
+        logger.exception('检测账户异常: %s', account_name)
+        error_log = {
+            '服务器': account_name,
+            '实例ID': account.get('instanceId', ''),
+            '错误信息': str(e),
+        }
+        await send_notification(error_log, notification_config)
+        return None
+
+
+async def check_async():
+    """主检测逻辑：所有账户并发检测"""
     config = load_config()
     accounts = config['Accounts']
     notification_config = config['Notification']
-    logs = []
 
-    for account in accounts:
-        # 验证 AK/SK 和实例 ID
-        if not validate_credentials_and_instance(account, notification_config):
-            continue
+    try:
+        results = await asyncio.gather(*[process_account(account, notification_config) for account in accounts])
+    finally:
+        await close_http_session()
+    write_log([log for log in results if log is not None])
 
-        try:
-            traffic = get_traffic(account['AccessKeyId'], account['AccessKeySecret'])
-            account_name = account.get('accountName', account['AccessKeyId'][:7] + '***')
-            usage_percentage = round((traffic / account['maxTraffic']) * 100, 2)
-            region_name = get_region_name(account['regionId'])
-
-            security_group_id = get_security_group_id(
-                account['instanceId'], account['AccessKeyId'], account['AccessKeySecret'], account['regionId'])
-
-            instance_details = get_instance_details(
-                account['AccessKeyId'], account['AccessKeySecret'], account['instanceId'], account['regionId'])
-
-            log = {
-                '实例ID': account['instanceId'],
-                '服务器': account_name,
-                '总流量': f"{account['maxTraffic']}GB",
-                '已使用流量': f"{round(traffic, 2)}GB",
-                '使用百分比': f"{usage_percentage}%",
-                '地区': region_name,
-                '实例到期时间': instance_details['到期时间'],
-                '公网IP地址': instance_details['公网IP地址'],
-                '使用率达到95%': '是' if usage_percentage >= 95 else '否',
-            }
-
-            is_enabled = is_security_group_rule_enabled(
-                security_group_id, account['AccessKeyId'], account['AccessKeySecret'], account['regionId'])
-
-            if usage_percentage >= 95:
-                if is_enabled:
-                    disable_security_group_rule(
-                        security_group_id, account['AccessKeyId'], account['AccessKeySecret'], account['regionId'])
-                    log['安全组状态'] = '已禁用 0.0.0.0/0 访问规则'
-                    notification_result = send_notification(log, notification_config)
-                    log['通知发送'] = '成功' if notification_result is True else f"失败: {notification_result}"
-                else:
-                    log['安全组状态'] = '规则已禁用，无需操作'
-                    log['通知发送'] = '不需要'
-            else:
-                if not is_enabled:
-                    enable_security_group_rule(
-                        security_group_id, account['AccessKeyId'], account['AccessKeySecret'], account['regionId'])
-                    log['安全组状态'] = '已恢复 0.0.0.0 访问规则'
-                    notification_result = send_notification(log, notification_config)
-                    log['通知发送'] = '成功' if notification_result is True else f"失败: {notification_result}"
-                else:
-                    log['安全组状态'] = '规则已启用，无需操作'
-                    log['通知发送'] = '不需要'
-
-            logs.append(log)
-        except Exception as e:
-            print(f'异常: {e}')
-            error_log = {
-                '服务器': account_name,
-                '实例ID': account.get('instanceId', ''),
-                '错误信息': str(e),
-            }
-            send_notification(error_log, notification_config)
-
-    write_log(logs)
+
+def check():
+    """主检测逻辑"""
+    asyncio.run(check_async())
+
+
+def dump_log_json(data):
+    """序列化日志，ujson 与标准库输出格式一致（不转义 /）"""
+    if ujson is not None:
+        return ujson.dumps(data, ensure_ascii=False, indent=4, escape_forward_slashes=False)
+    return json.dumps(data, ensure_ascii=False, indent=4)
 
 
 def write_log(logs):
@@ -448,7 +643,7 @@ def write_log(logs):
         '获取时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         '日志': logs,
     }
-    json_data = json.dumps(data, ensure_ascii=False, indent=4)
+    json_data = dump_log_json(data)
     log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data.json')
     with open(log_path, 'w', encoding='utf-8') as f:
         f.write(json_data)
@@ -456,4 +651,5 @@ def write_log(logs):
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
     check()
@@ -1,142 +1,114 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
+import asyncio
+import logging
 import os
 import sys
 from datetime import datetime
 
-# 复用主模块的公共函数
+# 复用主模块的公共函数和常量
 from aliyun_cdt_check import (
     load_config,
-    get_region_name,
-    get_traffic,
-    get_security_group_id,
-    is_security_group_rule_enabled,
-    get_instance_details,
-    validate_credentials_and_instance,
-    send_email_notification,
-    send_bark_notification,
-    send_tg_notification,
-    send_webhook_notification,
-    send_qywx_notification,
+    REGION_NAMES,
+    get_account_name,
+    collect_account_status,
+    send_notification_message,
+    close_http_session,
 )
 
+logger = logging.getLogger(__name__)
 
-def send_daily_notification_message(message, traffic, notification_config):
-    """发送每日通知"""
-    results = {}
-    title = notification_config.get('title', 'CDT流量统计')
 
-    if notification_config.get('enableEmail'):
-        results['email'] = send_email_notification(message, title, notification_config)
+# 进度条总格数及已用/未用字符
+PROGRESS_ALL_NUM = 20
+PROGRESS_DO_TEXT = '■'
+PROGRESS_UNDO_TEXT = '□'
 
-    if notification_config.get('enableBark'):
-        results['bark'] = send_bark_notification(message, notification_config['barkUrl'])
 
-    if notification_config.get('enableTG'):
-        results['tg'] = send_tg_notification(message, notification_config['tgBotToken'], notification_config['tgChatId'])
+def build_progress_bar(usage_percentage):
+    """根据使用百分比生成进度条"""
+    progress_val = round(usage_percentage)
+    progress_do_num = (
+        1 if 0 < usage_percentage < 1
+        else 0 if progress_val == 0
+        else PROGRESS_ALL_NUM - 1 if progress_val > 95 and usage_percentage < 100
+        else min(PROGRESS_ALL_NUM, round(0.5 + PROGRESS_ALL_NUM * progress_val / 100))
+    )
+    return PROGRESS_DO_TEXT * progress_do_num + PROGRESS_UNDO_TEXT * (PROGRESS_ALL_NUM - progress_do_num)
 
-    if notification_config.get('enableWebhook'):
-        daily_title = f"已使用{traffic} - {title}"
-        results['webhook'] = send_webhook_notification(
-            message, notification_config['webhookUrl'], daily_title, notification_config['webhookId'])
 
-    if notification_config.get('enableQywx'):
-        daily_title = f"已使用{traffic} - {title}"
-        results['qywx'] = send_qywx_notification(
-            message, daily_title, notification_config['touser'], notification_config['corpid'],
-            notification_config['corpsecret'], notification_config['agentid'],
-            notification_config['baseApiUrl'], notification_config['picUrl'])
+async def send_account_daily_notification(account, notification_config):
+    """发送单个账户的每日通知"""
+    # 检查是否启用通知
+    if not account.get('enableNotification', True):
+        logger.info('跳过账户 %s：未启用通知', get_account_name(account))
+        return
 
-    for key, result in results.items():
-        if result is not True:
-            print(f"通知发送失败: {json.dumps(results, ensure_ascii=False)}")
-            return False
+    # 检查是否仅在防火墙切换时通知
+    if account.get('onlyNotifyOnToggle', False):
+        logger.info('跳过账户 %s：仅在防火墙切换时通知', get_account_name(account))
+        return
 
-    print("通知发送成功")
-    return True
+    try:
+        status = await collect_account_status(account, notification_config)
+        if status is None:
+            return
+        traffic = status['traffic']
+        usage_percentage = status['usage_percentage']
 
+        if not status['is_enabled']:
+            return  # 安全组已禁用，不发送通知
 
-def send_daily_notification():
-    """每日通知主逻辑"""
-    config = load_config()
-    accounts = config['Accounts']
-    notification_config = config['Notification']
-
-    for account in accounts:
-        # 检查是否启用通知
-        if not account.get('enableNotification', True):
-            print(f"跳过账户 {account['accountName']}：未启用通知")
-            continue
-
-        # 检查是否仅在防火墙切换时通知
-        if account.get('onlyNotifyOnToggle', False):
-            print(f"跳过账户 {account['accountName']}：仅在防火墙切换时通知")
-            continue
-
-        # 验证 AK/SK 和实例 ID
-        if not validate_credentials_and_instance(account, notification_config):
-            continue
+        progress_bar = build_progress_bar(usage_percentage)
 
         try:
-            traffic = get_traffic(account['AccessKeyId'], account['AccessKeySecret'])
-            usage_percentage = round((traffic / account['maxTraffic']) * 100, 2)
+            formatted_datetime = datetime.fromisoformat(
+                status['expiration_time'].replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+        except (ValueError, AttributeError):
+            formatted_datetime = status['expiration_time']
 
-            instance_details = get_instance_details(
-                account['AccessKeyId'], account['AccessKeySecret'],
-                account['instanceId'], account['regionId'])
+        message = (
+            f"{account['accountName']}（{status['public_ip']}）\n"
+            f"{progress_bar} {usage_percentage}%\n"
+            f"已使用流量: {round(traffic, 2)}GB / {account['maxTraffic']}GB\n"
+            f"实例地区: {REGION_NAMES.get(account['regionId'], '未知地区')}\n"
+            f"到期时间: {formatted_datetime}\n"
+            f"实例ID: {account['instanceId']}\n"
+            f"安全组状态: 启用\n"
+        )
 
-            security_group_id = get_security_group_id(
-                account['instanceId'], account['AccessKeyId'],
-                account['AccessKeySecret'], account['regionId'])
+        traffic_str = f"{round(traffic, 2)}GB"
 
-            is_enabled = is_security_group_rule_enabled(
-                security_group_id, account['AccessKeyId'],
-                account['AccessKeySecret'], account['regionId'])
+        daily_title = f"已使用{traffic_str} - {notification_config.get('title', 'CDT流量统计')}"
 
-            if not is_enabled:
-                continue  # 安全组已禁用，不发送通知
+        result = await send_notification_message(message, notification_config, title_override=daily_title)
+        if result is True:
+            logger.info('通知发送成功: %s', get_account_name(account))
+        else:
+            logger.warning('账户 %s 通知发送失败: %s', get_account_name(account), result)
 
-            # 生成进度条
-            progress_val = round(usage_percentage)
-            progress_all_num = 20
-            progress_do_text = '■'
-            progress_undo_text = '□'
+    except Exception:
+        logger.exception('每日通知异常: %s', get_account_name(account))
 
-            if usage_percentage > 0 and usage_percentage < 1:
-                progress_do_num = 1
-            elif int(progress_val) == 0:
-                progress_do_num = 0
-            elif int(progress_val) > 95 and usage_percentage < 100:
-                progress_do_num = progress_all_num - 1
-            else:
-                progress_do_num = min(progress_all_num, round(0.5 + (progress_all_num * int(progress_val)) / 100))
 
-            progress_undo_num = progress_all_num - progress_do_num
-            progress_bar = progress_do_text * progress_do_num + progress_undo_text * progress_undo_num
-
-            try:
-                formatted_datetime = datetime.fromisoformat(
-                    instance_details['到期时间'].replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
-            except (ValueError, AttributeError):
-                formatted_datetime = instance_details['到期时间']
-
-            message = f"{account['accountName']}（{instance_details['公网IP地址']}）\n"
-            message += f"{progress_bar} {usage_percentage}%\n"
-            message += f"已使用流量: {round(traffic, 2)}GB / {account['maxTraffic']}GB\n"
-            message += f"实例地区: {get_region_name(account['regionId'])}\n"
-            message += f"到期时间: {formatted_datetime}\n"
-            message += f"实例ID: {account['instanceId']}\n"
-            message += f"安全组状态: 启用\n"
+async def send_daily_notification_async():
+    """每日通知主逻辑：所有账户并发处理"""
+    config = load_config()
+    accounts = config['Accounts']
+    notification_config = config['Notification']
 
-            traffic_str = f"{round(traffic, 2)}GB"
+    try:
+        await asyncio.gather(*[send_account_daily_notification(account, notification_config) for account in accounts])
+    finally:
+        await close_http_session()
 
-            send_daily_notification_message(message, traffic_str, notification_config)
 
-        except Exception as e:
-            print(f'异常: {e}')
+def send_daily_notification():
+    """每日通知主逻辑"""
+    asyncio.run(send_daily_notification_async())
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
     send_daily_notification()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from aliyun_cdt_check import AliyunClient, aliyun_sign_v3  # noqa: E402
+
+
+class AliyunSignV3Test(unittest.TestCase):
+    """使用阿里云 V3 签名文档中的示例校验签名结果"""
+
+    def setUp(self):
+        client = AliyunClient('YourAccessKeyId', 'YourAccessKeySecret', 'ecs.cn-shanghai.aliyuncs.com')
+        self.headers, self.canonical_query = aliyun_sign_v3(
+            client, 'RunInstances', '2014-05-26',
+            {
+                'RegionId': 'cn-shanghai',
+                'ImageId': 'win2019_1809_x64_dtc_zh-cn_40G_alibase_20230811.vhd',
+            },
+            date='2023-10-26T10:22:32Z',
+            nonce='3156853299f313e23d1673dc12e1703d',
+        )
+
+    def test_canonical_query_sorted_and_encoded(self):
+        self.assertEqual(
+            self.canonical_query,
+            'ImageId=win2019_1809_x64_dtc_zh-cn_40G_alibase_20230811.vhd&RegionId=cn-shanghai')
+
+    def test_authorization_matches_documented_signature(self):
+        self.assertEqual(
+            self.headers['Authorization'],
+            'ACS3-HMAC-SHA256 Credential=YourAccessKeyId,'
+            'SignedHeaders=host;x-acs-action;x-acs-content-sha256;x-acs-date;x-acs-signature-nonce;x-acs-version,'
+            'Signature=06563a9e1b43f5dfe96b81484da74bceab24a1d853912eee15083a6f0f3283c0')
+
+    def test_no_unsigned_content_type(self):
+        self.assertNotIn('content-type', {key.lower() for key in self.headers})
+
+
+if __name__ == '__main__':
+    unittest.main()